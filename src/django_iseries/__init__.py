@@ -4,7 +4,7 @@ __version__ = "1.0.5"
 
 try:
     import pyodbc as Database
-except:
+except ImportError:
     Database = None
 else:
     pyodbc_version = tuple(int(x) for x in Database.version.split('.'))
@@ -92,6 +92,9 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     can_introspect_ip_address_field = False
     can_introspect_time_field = True
     can_rollback_ddl = True
+    # several DDL statements can be sent as one BEGIN ATOMIC compound statement; the schema editor
+    # clears this on a connection whose server refuses it
+    supports_compound_ddl = True
     has_case_insensitive_like = False
     bare_select_suffix = ' FROM SYSIBM.SYSDUMMY1'
     implied_column_null = True
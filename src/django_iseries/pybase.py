@@ -18,7 +18,6 @@
 
 
 
-import datetime
 import platform
 import re
 
@@ -30,6 +29,7 @@ import sqlparse
 from django.db import utils
 
 from django_iseries import Database
+from django_iseries.quoting import quote_literal
 
 dbms_name = 'dbms_name'
 
@@ -255,8 +255,4 @@ class DB2CursorWrapper:
         return row[0]
 
     def quote_value(self, value):
-        if isinstance(value, (datetime.datetime, datetime.date, datetime.time, str)):
-            return f"'{value}'"
-        if isinstance(value, bool):
-            return '1' if value else '0'
-        return str(value)
+        return quote_literal(value)
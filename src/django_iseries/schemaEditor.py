@@ -17,21 +17,66 @@
 # +--------------------------------------------------------------------------+
 
 import copy
-import datetime
-import uuid
+import re
+from contextlib import contextmanager
+from functools import lru_cache
 
 try:
     from django.db.backends.schema import BaseDatabaseSchemaEditor
 except ImportError:
     from django.db.backends.base.schema import BaseDatabaseSchemaEditor
 
-from django.db import models
+from django.core.exceptions import FieldError
+from django.db import DatabaseError, models
 from django.db.backends.utils import truncate_name
 from django.db.models.fields.related import ManyToManyField
 from django import VERSION as djangoVersion
-from . import Database
 
-Error = Database.Error
+from django_iseries.quoting import quote_literal
+
+_DJANGO_LT_19 = djangoVersion[0:2] < (1, 9)
+
+# SQL0084: the statement is not allowed where it was sent, here inside a compound statement. iAccess
+# reports it as SQLSTATE 42612 or, as for many errors, as HY000 with the SQLCODE in the message
+_SQLSTATE_NOT_ALLOWED = '42612'
+_SQLCODE_0084_REGEX = re.compile(r"^(\[.+] *){4}SQL0084.*")
+
+# %%, or a %-style placeholder with an optional (key), flags, width, precision and its conversion
+_SQL_PLACEHOLDER = re.compile(r'%(?:\((\w+)\))?[#0 +-]*\d*(?:\.\d+)?[diouxXeEfFgGcrsa%]')
+
+
+def _bind_sql(template, **invariants):
+    """
+    Fill in the loop-invariant keys of a %-style SQL template and leave the other keys for the loop body.
+    A bound key keeps its own conversion, e.g. %(max)d, and every other placeholder, %% included, is
+    left as written, so the result formats exactly like the template would with all keys at once.
+    """
+    def bind(match):
+        key = match.group(1)
+        if key not in invariants:
+            return match.group(0)
+        return (match.group(0) % {key: invariants[key]}).replace('%', '%%')
+    return _SQL_PLACEHOLDER.sub(bind, template)
+
+
+def _splice_sql(template, key, sql):
+    """Put raw SQL text in place of the key's placeholder in a %-style SQL template, whatever its conversion."""
+    def splice(match):
+        return sql.replace('%', '%%') if match.group(1) == key else match.group(0)
+    return _SQL_PLACEHOLDER.sub(splice, template)
+
+
+@lru_cache(maxsize=4096)
+def _join_renamed(columns, old_column, new_column):
+    """Comma-separated column list, with old_column renamed to new_column. columns must be a tuple."""
+    if old_column == new_column or old_column not in columns:
+        return ', '.join(columns)
+    return ', '.join([new_column if column == old_column else column for column in columns])
+
+
+def _foreign_key_names(constraints):
+    """Names of the foreign keys in get_constraints() output, which flags them 1, 0 or None."""
+    return [name for name, constr_dict in constraints.items() if constr_dict['foreign_key']]
 
 
 class DB2SchemaEditor(BaseDatabaseSchemaEditor):
@@ -41,44 +86,210 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
     sql_create_column = "ALTER TABLE %(table)s ADD COLUMN %(column)s %(definition)s"
     sql_alter_column_type = "ALTER COLUMN %(column)s SET DATA TYPE %(type)s"
     sql_alter_column_type_from_int_to_auto = "ALTER COLUMN %(column)s SET GENERATED BY DEFAULT AS IDENTITY( START WITH %(max)d, INCREMENT BY 1, CACHE 10 ORDER )"
+    # START WITH only takes a constant, so the new start value is spliced in with EXECUTE IMMEDIATE
+    sql_alter_column_to_auto = (
+        "BEGIN ATOMIC\n"
+        "DECLARE V_MAX BIGINT;\n"
+        "SET V_MAX = COALESCE((SELECT MAX(%(column)s) FROM %(table)s), 0) + 1;\n"
+        "%(changes)s\n"
+        "END"
+    )
     sql_create_fk = "ALTER TABLE %(table)s ADD CONSTRAINT %(name)s FOREIGN KEY (%(column)s) REFERENCES %(to_table)s (%(to_column)s)"
     sql_delete_pk = "ALTER TABLE %(table)s DROP CONSTRAINT %(name)s"
     sql_delete_unique = "ALTER TABLE %(table)s DROP CONSTRAINT %(name)s"
     sql_drop_pk = "ALTER TABLE %(table)s DROP PRIMARY KEY"
+    sql_drop_constraint = "DROP CONSTRAINT %(name)s"
     sql_drop_default = "ALTER TABLE %(table)s ALTER COLUMN %(column)s DROP DEFAULT"
-
-    @property
-    def sql_create_pk(self):
-        self._reorg_tables()
-        return "ALTER TABLE %(table)s ADD CONSTRAINT %(name)s PRIMARY KEY (%(columns)s)"
+    sql_copy_column = "UPDATE %(table)s SET %(new_column)s = %(old_column)s"
+    sql_create_pk = "ALTER TABLE %(table)s ADD CONSTRAINT %(name)s PRIMARY KEY (%(columns)s)"
+    sql_compound = "BEGIN ATOMIC\n%(statements)s;\nEND"
+
+    def __init__(self, *args, **kwargs):
+        super(DB2SchemaEditor, self).__init__(*args, **kwargs)
+        self._ddl_buffer = []
+        self._batch_depth = 0
+        self._reorg_pending = False
+        self._constraints_cache = {}
+        self._index_name_cache = {}
 
     def prepare_default(self, value):
         return self.quote_value(value)
 
+    def execute(self, sql, params=()):
+        # Anything queued by _batched_execute() has to reach the server first
+        self._flush_ddl()
+        super(DB2SchemaEditor, self).execute(sql, params)
+
+    @contextmanager
+    def _batched(self):
+        """
+        Queue the DDL passed to _batched_execute() and send it as a single compound
+        statement when the outermost batch exits, saving a round trip per statement.
+        """
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            if self._batch_depth == 1:
+                # nothing queued has been sent yet
+                self._ddl_buffer = []
+            raise
+        finally:
+            self._batch_depth -= 1
+        if not self._batch_depth:
+            self._flush_ddl()
+
+    def _batched_execute(self, sql, params=None):
+        if params or self.collect_sql or not self._batch_depth:
+            self.execute(sql, params or ())
+        else:
+            self._ddl_buffer.append(str(sql))
+
+    def _execute_many(self, statements):
+        """Send already formatted statements in one round trip where possible."""
+        with self._batched():
+            for sql in statements:
+                self._batched_execute(sql)
+
+    def _batched_alter_column(self, sql):
+        """_batched_execute() for an ALTER TABLE changing a column, which leaves the table waiting for a reorg."""
+        self._batched_execute(sql)
+        self._reorg_pending = True
+
+    def _flush_ddl(self):
+        statements, self._ddl_buffer = self._ddl_buffer, []
+        self._send_ddl(statements)
+
+    def _send_ddl(self, statements):
+        """Send the statements as one compound statement, or one by one where the server refuses that."""
+        features = self.connection.features
+        if len(statements) > 1 and features.supports_compound_ddl:
+            try:
+                super(DB2SchemaEditor, self).execute(self.sql_compound % {'statements': ';\n'.join(statements)})
+                return
+            except DatabaseError as e:
+                # A statement the server refuses inside a compound gets the whole compound rejected before
+                # any of it runs, so only then is sending them one by one safe. Any other error comes from
+                # running the compound, which may have done part of its work, and must surface as it is.
+                if not self._is_not_allowed_in_compound(e):
+                    raise
+                features.supports_compound_ddl = False
+        for sql in statements:
+            super(DB2SchemaEditor, self).execute(sql)
+
+    @staticmethod
+    def _is_not_allowed_in_compound(error):
+        if not error.args:
+            return False
+        if error.args[0] == 'HY000' and len(error.args) > 1 and isinstance(error.args[1], str):
+            return bool(_SQLCODE_0084_REGEX.match(error.args[1]))
+        return error.args[0] == _SQLSTATE_NOT_ALLOWED
+
+    def _constraint_names(self, *args, **kwargs):
+        self._flush_ddl()
+        return super(DB2SchemaEditor, self)._constraint_names(*args, **kwargs)
+
+    def _cached_constraints(self, model):
+        """
+        Constraints of the model's table, introspected at most once per alter_field().
+        Callers pass the names they drop to _forget_constraints() to keep the result current.
+        """
+        table_name = model._meta.db_table
+        constraints = self._constraints_cache.get(table_name)
+        if constraints is None:
+            self._flush_ddl()
+            with self.connection.cursor() as cur:
+                constraints = self.connection.introspection.get_constraints(cur, table_name)
+            self._constraints_cache[table_name] = constraints
+        return constraints
+
+    def _forget_constraints(self, model, names):
+        constraints = self._constraints_cache.get(model._meta.db_table)
+        if constraints is not None:
+            for name in names:
+                constraints.pop(name, None)
+
+    def _cached_constraint_names(self, model, column_names=None, unique=None, primary_key=None, index=None,
+                                 foreign_key=None, check=None):
+        """Same filtering as _constraint_names(), applied to _cached_constraints()."""
+        if column_names is not None:
+            column_names = [self.connection.introspection.identifier_converter(name) for name in column_names]
+        result = []
+        for name, infodict in self._cached_constraints(model).items():
+            if column_names is None or column_names == infodict['columns']:
+                if unique is not None and infodict['unique'] != unique:
+                    continue
+                if primary_key is not None and infodict['primary_key'] != primary_key:
+                    continue
+                if index is not None and infodict['index'] != index:
+                    continue
+                if check is not None and infodict['check'] != check:
+                    continue
+                if foreign_key is not None and not infodict['foreign_key']:
+                    continue
+                result.append(name)
+        return result
+
+    def _cached_index_name(self, model, column_names, suffix):
+        """_create_index_name() for the model's table, computed once per alter_field()."""
+        key = (model._meta.db_table, tuple(column_names), suffix)
+        name = self._index_name_cache.get(key)
+        if name is None:
+            name = self._create_index_name(model._meta.db_table, list(column_names), suffix=suffix)
+            self._index_name_cache[key] = name
+        return name
+
+    def _field_ddl_signature(self, field):
+        """Everything about a field that alter_field() can turn into DDL, or None where that cannot be told."""
+        db_params = field.db_parameters(connection=self.connection)
+        if field.remote_field:
+            try:
+                target_column = field.target_field.column
+            except FieldError:
+                # a ForeignObject over several columns has no single target field
+                return None
+            related = (field.remote_field.model._meta.db_table, target_column, getattr(field, 'db_constraint', None))
+        else:
+            related = None
+        return (db_params['type'], db_params['check'], field.column, field.null, field.unique, field.primary_key,
+                field.db_index, field.default, related)
+
     def alter_field(self, model, old_field, new_field, strict=False):
-        alter_field_data_type = False
-        alter_field_nullable = False
-        alter_field_default = False
-        alter_field_primary_key = False
-        alter_field_name = False
-        alter_field_check_constraint = False
-        alter_field_unique = False
-        alter_field_index = False
+        # Nothing to do for changes that never reach the database, e.g. help_text or choices
+        if not (old_field.many_to_many or new_field.many_to_many):
+            old_signature = self._field_ddl_signature(old_field)
+            if old_signature is not None and old_signature == self._field_ddl_signature(new_field):
+                return
+        try:
+            with self._batched():
+                result = self._batched_alter_field(model, old_field, new_field, strict)
+        finally:
+            self._constraints_cache.clear()
+            self._index_name_cache.clear()
+        self._flush_reorg()
+        return result
+
+    def _batched_alter_field(self, model, old_field, new_field, strict=False):
         rebuild_incomming_fk = False
         alter_incomming_fk_data_type = False
         deferred_constraints = {
             'pk': {},
             'unique': {},
             'index': {},
-            'check': {}
+            'unique_index': {}
         }
 
         old_db_field = old_field.db_parameters(connection=self.connection)
         new_db_field = new_field.db_parameters(connection=self.connection)
+        # FKs of other models pointing at this one (what get_all_related_objects() used to return)
+        related_objects = tuple(
+            f for f in new_field.model._meta.get_fields()
+            if (f.one_to_many or f.one_to_one) and f.auto_created and not f.concrete
+        )
         old_db_field_type = old_db_field['type']
         new_db_field_type = new_db_field['type']
 
-        if old_field.remote_field is not None and hasattr(old_field.remote_field, 'through'):
+        if getattr(old_field.remote_field, 'through', None) is not None:
             rel_condition = (
                         old_field.remote_field.through and new_field.remote_field.through and old_field.remote_field.through._meta.auto_created and new_field.remote_field.through._meta.auto_created)
         else:
@@ -102,97 +313,91 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
                 else:
                     alter_incomming_fk_data_type = True
             old_field, new_field = self.alterFieldDataTypeByRemaking(model, old_field, new_field, strict)
+            # only the old field is replaced (by the temporary column), new_db_field still holds
             old_db_field = old_field.db_parameters(connection=self.connection)
-            new_db_field = new_field.db_parameters(connection=self.connection)
             old_db_field_type = old_db_field['type']
-            new_db_field_type = new_db_field['type']
-
-        if old_db_field_type != new_db_field_type:
-            alter_field_data_type = True
-
-        if old_field.column != new_field.column:
-            alter_field_name = True
-        if old_field.db_index != new_field.db_index:
-            alter_field_index = True
-        if old_field.unique != new_field.unique:
-            alter_field_unique = True
-        if old_field.primary_key != new_field.primary_key:
-            alter_field_primary_key = True
-        if old_db_field['check'] != new_db_field['check']:
-            alter_field_check_constraint = True
-        if old_field.null != new_field.null:
-            alter_field_nullable = True
-
-        old_default = self.effective_default(old_field)
-        new_default = self.effective_default(new_field)
+
+        qtable = self.quote_name(model._meta.db_table)
+        qold_col = self.quote_name(old_field.column)
+        qnew_col = self.quote_name(new_field.column)
+
+        alter_field_data_type = old_db_field_type != new_db_field_type
+        alter_field_name = old_field.column != new_field.column
+        alter_field_index = old_field.db_index != new_field.db_index
+        alter_field_unique = old_field.unique != new_field.unique
+        alter_field_primary_key = old_field.primary_key != new_field.primary_key
+        alter_field_check_constraint = old_db_field['check'] != new_db_field['check']
+        alter_field_nullable = old_field.null != new_field.null
+
+        # Defaults only matter when the old field had one; skip evaluating (possibly callable) defaults otherwise
         if (old_field.default is not None) and old_field.has_default():
-            if old_default != new_default:
-                alter_field_default = True
+            old_default = self.effective_default(old_field)
+            new_default = self.effective_default(new_field)
+            alter_field_default = old_default != new_default
+        else:
+            old_default = new_default = None
+            alter_field_default = False
 
         # Need to remove Primary Key
         if alter_field_primary_key and old_field.primary_key:
             if strict:
-                pk_names = self._constraint_names(model, [old_field.column], primary_key=True)
+                pk_names = self._cached_constraint_names(model, [old_field.column], primary_key=True)
                 if len(pk_names) == 0:
                     raise ValueError("Found no primary key in %s.%s " % (model._meta.db_table, old_field.column))
-            self.execute(
+            self._batched_execute(
                 self.sql_drop_pk % {
-                    'table': self.quote_name(model._meta.db_table)
+                    'table': qtable
                 }
             )
+            self._forget_constraints(model, self._cached_constraint_names(model, primary_key=True))
 
         # Need to remove unique Key
         if alter_field_unique and old_field.unique or (
                 old_field.unique and alter_field_primary_key and not old_field.primary_key):
-            unique_key_names = self._constraint_names(model, [old_field.column], unique=True)
+            unique_key_names = self._cached_constraint_names(model, [old_field.column], unique=True)
             if strict and len(unique_key_names) != 1:
                 raise ValueError("Found wrong number of unique constraints for (table)s.(column)s" % {
                     'table': model._meta.db_table, 'column': old_field.column
                 })
 
+            sql_delete_unique = _bind_sql(self.sql_delete_unique, table=qtable)
             for unique_key_name in unique_key_names:
-                self.execute(
-                    self.sql_delete_unique % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'name': unique_key_name
-                    }
-                )
+                self._batched_execute(sql_delete_unique % {'name': unique_key_name})
+            self._forget_constraints(model, unique_key_names)
 
         # Need to remove Index
         if alter_field_index and old_field.db_index:
-            index_names = self._constraint_names(model, [old_field.column], index=True)
+            index_names = self._cached_constraint_names(model, [old_field.column], index=True)
             if strict and len(index_names) != 1:
                 raise ValueError("Found wrong number of Indexes for (table)s.(column)s" % {
                     'table': model._meta.db_table, 'column': old_field.column
                 })
             for index_name in index_names:
-                self.execute(
+                self._batched_execute(
                     self.sql_delete_index % {
                         'name': index_name
                     }
                 )
+            self._forget_constraints(model, index_names)
 
         # Need to remove check constraint
         if alter_field_check_constraint and old_db_field['check']:
-            check_constraint_names = self._constraint_names(model, [old_field.column], check=True)
+            check_constraint_names = self._cached_constraint_names(model, [old_field.column], check=True)
             if strict and len(check_constraint_names) != 1:
                 raise ValueError("Found wrong number of check constraints for (table)s.(column)s" % {
                     'table': model._meta.db_table, 'column': old_field.column
                 })
+            sql_delete_check = _bind_sql(self.sql_delete_check, table=qtable)
             for check_constraint_name in check_constraint_names:
-                self.execute(
-                    self.sql_delete_check % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'name': check_constraint_name
-                    }
-                )
+                self._batched_execute(sql_delete_check % {'name': check_constraint_name})
+            self._forget_constraints(model, check_constraint_names)
 
         # Need to remove Nullability
         if alter_field_nullable and old_field.null:
-            sql = self.sql_alter_column_not_null % {'column': self.quote_name(old_field.column)}
-            self.execute(
+            sql = self.sql_alter_column_not_null % {'column': qold_col}
+            self._batched_alter_column(
                 self.sql_alter_column % {
-                    'table': self.quote_name(model._meta.db_table),
+                    'table': qtable,
                     'changes': sql
                 }
             )
@@ -200,43 +405,39 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
         # Drop all FK constraints, if require we will make it again
         flag = old_field.remote_field
         if flag:
-            fk_names = self._constraint_names(model, [old_field.column], foreign_key=True)
+            fk_names = self._cached_constraint_names(model, [old_field.column], foreign_key=True)
+            sql_delete_fk = _bind_sql(self.sql_delete_fk, table=qtable)
             for fk_name in fk_names:
-                self.execute(
-                    self.sql_delete_fk % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'name': fk_name
-                    }
-                )
+                self._batched_execute(sql_delete_fk % {'name': fk_name})
+            self._forget_constraints(model, fk_names)
 
         if alter_field_name or alter_field_data_type:
 
             # Drop all incoming FK constraint, if require we will make it again
             if old_field.primary_key and new_field.primary_key:
                 rebuild_incomming_fk = True
-                for incoming_fks in old_field.model._meta.get_fields():
-                    fk_names = self._constraint_names(incoming_fks.model, [incoming_fks.field.column], foreign_key=True)
+                for incoming_fks in related_objects:
+                    fk_model = incoming_fks.field.model
+                    sql_delete_fk = _bind_sql(self.sql_delete_fk, table=self.quote_name(fk_model._meta.db_table))
+                    fk_names = self._cached_constraint_names(fk_model, [incoming_fks.field.column], foreign_key=True)
                     for fk_name in fk_names:
-                        self.execute(
-                            self.sql_delete_fk % {
-                                'table': self.quote_name(incoming_fks.model._meta.db_table),
-                                'name': fk_name,
-                            }
-                        )
+                        self._batched_execute(sql_delete_fk % {'name': fk_name})
+                    self._forget_constraints(fk_model, fk_names)
 
             # Defer constraint check
-            with self.connection.cursor() as cur:
-                constraints = self.connection.introspection.get_constraints(cur, model._meta.db_table)
+            constraints = self._cached_constraints(model)
+            # check constraints stay in place: introspection does not return their clause, so
+            # _restore_constraints_check() could not recreate them
             self._defer_constraints_check(constraints, deferred_constraints, old_field, new_field, model, defer_pk=True,
-                                          defer_unique=True, defer_index=True, defer_check=True)
+                                          defer_unique=True, defer_index=True)
 
             # Need to change the field name
             if alter_field_name:
-                self.execute(
+                self._batched_alter_column(
                     self.sql_rename_column % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'old_column': self.quote_name(old_field.column),
-                        'new_column': self.quote_name(new_field.column),
+                        'table': qtable,
+                        'old_column': qold_col,
+                        'new_column': qnew_col,
                     }
                 )
 
@@ -249,53 +450,25 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
                         alter_incomming_fk_data_type = True
                 # Will make default later
                 if (old_field.default is not None) and (old_field.has_default()) and (old_default is not None):
-                    self.execute(self.sql_drop_default % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'column': self.quote_name(new_field.column)
+                    self._batched_alter_column(self.sql_drop_default % {
+                        'table': qtable,
+                        'column': qnew_col
                     }
                                  )
                 if isinstance(new_field, models.AutoField):
-                    with self.connection.cursor() as cur:
-                        cur.execute(
-                            'SELECT MAX( %(column)s ) from %(table)s' % {
-                                'column': self.quote_name(new_field.column),
-                                'table': self.quote_name(model._meta.db_table),
-                            }
-                        )
-                        max = cur.fetchone()
-                        if max[0] is None:
-                            max = 0
-                        else:
-                            max = max[0]
-                    if not isinstance(old_field, models.IntegerField):
-                        sql = self.sql_alter_column_type % {
-                            'column': self.quote_name(new_field.column),
-                            'type': 'Integer'
-                        }
-                        self.execute(
-                            self.sql_alter_column % {
-                                'table': self.quote_name(model._meta.db_table),
-                                'changes': sql
-                            }
-                        )
-                    sql = self.sql_alter_column_type_from_int_to_auto % {
-                        'column': self.quote_name(new_field.column),
-                        'max': max + 1
-                    }
-                    self.execute(
-                        self.sql_alter_column % {
-                            'table': self.quote_name(model._meta.db_table),
-                            'changes': sql
-                        }
-                    )
+                    # Finding the current maximum and both ALTERs happen server side, in one round trip
+                    self.execute(self._alter_column_to_auto_sql(
+                        qtable, qnew_col, to_integer=not isinstance(old_field, models.IntegerField)
+                    ))
+                    self._reorg_pending = True
                 else:
                     sql = self.sql_alter_column_type % {
-                        'column': self.quote_name(new_field.column),
+                        'column': qnew_col,
                         'type': new_db_field_type
                     }
-                    self.execute(
+                    self._batched_alter_column(
                         self.sql_alter_column % {
-                            'table': self.quote_name(model._meta.db_table),
+                            'table': qtable,
                             'changes': sql
                         }
                     )
@@ -309,19 +482,20 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
                 if alter_field_data_type or alter_field_nullable:
                     pass
                 else:
-                    self.execute(self.sql_drop_default % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'column': self.quote_name(new_field.column)
+                    self._batched_alter_column(self.sql_drop_default % {
+                        'table': qtable,
+                        'column': qnew_col
                     }
                                  )
             else:
+                # Db2 for i takes no parameter markers in DDL, so the default is inlined as an escaped literal
                 sql = self.sql_alter_column_default % {
-                    'column': self.quote_name(new_field.column),
+                    'column': qnew_col,
                     'default': self.prepare_default(new_default),
                 }
-                self.execute(
+                self._batched_alter_column(
                     self.sql_alter_column % {
-                        'table': self.quote_name(model._meta.db_table),
+                        'table': qtable,
                         'changes': sql
                     }
                 )
@@ -331,147 +505,177 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
             sql = ""
             if new_field.null:
                 sql = self.sql_alter_column_null % {
-                    'column': self.quote_name(new_field.column)
+                    'column': qnew_col
                 }
             else:
                 sql = self.sql_alter_column_not_null % {
-                    'column': self.quote_name(new_field.column)
+                    'column': qnew_col
                 }
-            self.execute(
+            self._batched_alter_column(
                 self.sql_alter_column % {
-                    'table': self.quote_name(model._meta.db_table),
+                    'table': qtable,
                     'changes': sql
                 }
             )
 
         # Need to add check constraint
         if alter_field_check_constraint and new_db_field['check']:
-            self.execute(
+            self._batched_execute(
                 self.sql_create_check % {
-                    'table': self.quote_name(model._meta.db_table),
-                    'name': self._create_index_name(model, [new_field.column], suffix="_check"),
-                    'column': self.quote_name(new_field.column),
+                    'table': qtable,
+                    'name': self._cached_index_name(model, [new_field.column], "_check"),
+                    'column': qnew_col,
                     'check': new_db_field['check'],
                 }
             )
         # Need to change incoming foreign key field type
         incoming_relations = []
         if alter_incomming_fk_data_type:
-            incoming_relations.extend(new_field.model._meta.get_all_related_objects())
+            incoming_relations.extend(related_objects)
 
         # Need to add new PK
         if alter_field_primary_key and new_field.primary_key:
             # Drop old PK if available
-            try:
-                self.execute(
+            old_pk_names = self._cached_constraint_names(model, primary_key=True)
+            if old_pk_names:
+                self._batched_execute(
                     self.sql_drop_pk % {
-                        'table': self.quote_name(model._meta.db_table)
+                        'table': qtable
                     }
                 )
-            except:
-                pass
-            self.__model = model
-            self.execute(
+                self._forget_constraints(model, old_pk_names)
+            self._before_create_pk()
+            self._batched_execute(
                 self.sql_create_pk % {
-                    'table': self.quote_name(model._meta.db_table),
-                    'name': self._create_index_name(model, [new_field.column], suffix="_pk"),
-                    'columns': self.quote_name(new_field.column)
+                    'table': qtable,
+                    'name': self._cached_index_name(model, [new_field.column], "_pk"),
+                    'columns': qnew_col
                 }
             )
             # Need to update all incoming relations
-            incoming_relations.extend(new_field.model._meta.get_all_related_objects())
+            incoming_relations.extend(related_objects)
         # Need to add a unique constraint
         elif alter_field_unique and new_field.unique:
-            self.execute(
+            self._batched_execute(
                 self.sql_create_unique % {
-                    'table': self.quote_name(model._meta.db_table),
-                    'name': self._create_index_name(model._meta.db_table, [new_field.column], suffix="_uniq"),
-                    'columns': self.quote_name(new_field.column),
+                    'table': qtable,
+                    'name': self._cached_index_name(model, [new_field.column], "_uniq"),
+                    'columns': qnew_col,
                 }
             )
             # Need to add a index
         elif alter_field_index and new_field.db_index:
-            self.execute(
+            self._batched_execute(
                 self.sql_create_index % {
-                    'table': self.quote_name(model._meta.db_table),
-                    'name': self._create_index_name(model, [new_field.column], suffix="_index"),
-                    'columns': self.quote_name(new_field.column),
+                    'table': qtable,
+                    'name': self._cached_index_name(model, [new_field.column], "_index"),
+                    'columns': qnew_col,
+                    'include': "",
                     'extra': "",
+                    'condition': "",
                 }
             )
-        # Update incoming FK field
+        # Update incoming FK field, with one multi-action ALTER TABLE per related table;
+        # both extends above can list the same relation, so each column is changed once
+        incoming_changes = {}
         for inc_rel in incoming_relations:
-            fk_db_field = inc_rel.field.db_parameters(connection=self.connection)
-            fk_db_field_type = fk_db_field['type']
-            sql = self.sql_alter_column_type % {
-                'column': self.quote_name(inc_rel.field.column),
-                'type': fk_db_field_type,
-            }
-            self.execute(
+            fk_field = inc_rel.field
+            table_changes = incoming_changes.setdefault(fk_field.model._meta.db_table, {})
+            if fk_field.column not in table_changes:
+                table_changes[fk_field.column] = self.sql_alter_column_type % {
+                    'column': self.quote_name(fk_field.column),
+                    'type': fk_field.db_parameters(connection=self.connection)['type'],
+                }
+        for fk_table, changes in incoming_changes.items():
+            self._batched_alter_column(
                 self.sql_alter_column % {
-                    'table': self.quote_name(inc_rel.model._meta.db_table),
-                    'changes': sql
+                    'table': self.quote_name(fk_table),
+                    'changes': ' '.join(changes.values())
                 }
             )
 
-        # need to reorg table if we changed the field type of fk field
-        if len(incoming_relations) > 0:
-            self._reorg_tables()
+        # the FK constraints below can only be added once the tables altered above are reorged
+        self._flush_reorg()
 
         # Rebuild/make FK constraint, if it have any
-        if (djangoVersion[0:2] < (1, 9)):
+        if _DJANGO_LT_19:
             if new_field.rel:
-                self.execute(
+                self._batched_execute(
                     self.sql_create_fk % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'name': self._create_index_name(model, [new_field.column], suffix="_fk"),
-                        'column': self.quote_name(new_field.column),
+                        'table': qtable,
+                        'name': self._cached_index_name(model, [new_field.column], "_fk"),
+                        'column': qnew_col,
                         'to_table': self.quote_name(new_field.rel._meta.db_table),
                         'to_column': self.quote_name(new_field.rel.get_related_field().column),
                     }
                 )
         else:
             if new_field.remote_field:
-                self.execute(
+                self._batched_execute(
                     self.sql_create_fk % {
-                        'table': self.quote_name(model._meta.db_table),
-                        'name': self._create_index_name(model, [new_field.column], suffix="_fk"),
-                        'column': self.quote_name(new_field.column),
+                        'table': qtable,
+                        'name': self._cached_index_name(model, [new_field.column], "_fk"),
+                        'column': qnew_col,
                         'to_table': self.quote_name(new_field.remote_field.model._meta.db_table),
                         'to_column': self.quote_name(new_field.remote_field.get_related_field().column),
                     }
                 )
         # Rebuild incoming FK constraints
         if rebuild_incomming_fk:
-            for inc_rel in new_field.model._meta.get_all_related_objects():
-                self.execute(
-                    self.sql_create_fk % {
-                        'table': self.quote_name(inc_rel.model._meta.db_table),
-                        'name': self._create_index_name(inc_rel.model, [inc_rel.field.column], suffix="_fk"),
-                        'column': self.quote_name(inc_rel.field.column),
-                        'to_table': self.quote_name(model._meta.db_table),
-                        'to_column': self.quote_name(new_field.column),
+            sql_create_fk = _bind_sql(self.sql_create_fk, to_table=qtable, to_column=qnew_col)
+            for inc_rel in related_objects:
+                fk_field = inc_rel.field
+                fk_model = fk_field.model
+                self._batched_execute(
+                    sql_create_fk % {
+                        'table': self.quote_name(fk_model._meta.db_table),
+                        'name': self._cached_index_name(fk_model, [fk_field.column], "_fk"),
+                        'column': self.quote_name(fk_field.column),
                     }
                 )
 
+    def _alter_column_to_auto_sql(self, qtable, qcolumn, to_integer):
+        """The compound statement making an integer column an identity that starts past its current maximum."""
+        changes = []
+        if to_integer:
+            changes.append(self.sql_alter_column_type % {
+                'column': qcolumn,
+                'type': 'Integer'
+            })
+        # the template's max placeholder takes the declared maximum, as text spliced into the statement
+        changes.append(_splice_sql(self.sql_alter_column_type_from_int_to_auto, 'max', "' || CHAR(V_MAX) || '") % {
+            'column': qcolumn
+        })
+        return self.sql_alter_column_to_auto % {
+            'table': qtable,
+            'column': qcolumn,
+            'changes': '\n'.join([
+                "EXECUTE IMMEDIATE '%s';" % (self.sql_alter_column % {
+                    'table': qtable,
+                    'changes': sql
+                }) for sql in changes
+            ])
+        }
+
     def alterFieldDataTypeByRemaking(self, model, old_field, new_field, strict):
+        # Field.__deepcopy__ only copies the field and its remote_field shallowly. Field.clone() would be
+        # no cheaper and loses the name, column, model and resolved relation add_field() relies on.
         tmp_new_field = copy.deepcopy(new_field)
         tmp_new_field.column = truncate_name("%s%s" % (self.psudo_column_prefix, tmp_new_field.column),
                                              self.connection.ops.max_name_length())
         self.add_field(model, tmp_new_field)
 
-        # Transfer data from old field to new tmp field
-        self.execute("UPDATE %s set %s=%s" % (
-            self.quote_name(model._meta.db_table),
-            self.quote_name(tmp_new_field.column),
-            self.quote_name(old_field.column)
-        )
-                     )
+        # Transfer data from old field to new tmp field. Identifiers cannot be bound as parameters; repeated
+        # statements are still only prepared once, in the extended dynamic SQL package set up by the DSN.
+        self.execute(self.sql_copy_column % {
+            'table': self.quote_name(model._meta.db_table),
+            'new_column': self.quote_name(tmp_new_field.column),
+            'old_column': self.quote_name(old_field.column),
+        })
         self.remove_field(model, old_field)
         return tmp_new_field, new_field
 
     def add_field(self, model, field):
-        self.__model = model
         notnull = not field.null
         field.null = True
         p_key = field.primary_key
@@ -480,7 +684,7 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
         field._unique = False
 
         super(DB2SchemaEditor, self).add_field(model, field)
-        if field.remote_field is not None and hasattr(field.remote_field, 'through'):
+        if getattr(field.remote_field, 'through', None) is not None:
             rel_condition = field.remote_field.through._meta.auto_created
         else:
             rel_condition = False
@@ -488,58 +692,58 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
         if isinstance(field, ManyToManyField) and rel_condition:
             return
         else:
-            self._reorg_tables()
+            self._reorg_pending = True
         sql = None
         if notnull or unique or p_key:
-            del_column = self.sql_delete_column % {
-                'table': self.quote_name(model._meta.db_table), 'column': self.quote_name(field.column)
-            }
+            qtable = self.quote_name(model._meta.db_table)
+            qcolumn = self.quote_name(field.column)
+            del_column = self.sql_delete_column % {'table': qtable, 'column': qcolumn}
             if notnull:
                 field.null = False
-                sql = self.sql_alter_column_not_null % {'column': self.quote_name(field.column)}
-                sql = self.sql_alter_column % {'table': self.quote_name(model._meta.db_table), 'changes': sql}
+                sql = self.sql_alter_column_not_null % {'column': qcolumn}
+                sql = self.sql_alter_column % {'table': qtable, 'changes': sql}
                 try:
                     self.execute(sql)
-                    self._reorg_tables()
-                except Error as e:
+                    self._reorg_pending = True
+                except DatabaseError:
                     self.execute(del_column)
-                    raise e
+                    raise
             if p_key:
                 field.primary_key = True
                 cur = self.connection.cursor()
                 # remove other pk if available
+                sql_delete_pk = _bind_sql(self.sql_delete_pk, table=qtable)
                 for other_pk in cur.connection.primary_keys(True, cur.connection.get_current_schema(),
                                                             model._meta.db_table):
-                    self.execute(
-                        self.sql_delete_pk % {
-                            'table': self.quote_name(model._meta.db_table),
-                            'name': other_pk['PK_NAME']
-                        }
-                    )
+                    self.execute(sql_delete_pk % {'name': other_pk['PK_NAME']})
+                self._before_create_pk()
                 sql = self.sql_create_pk % {
-                    'table': self.quote_name(model._meta.db_table),
-                    'name': self._create_index_name(model, [field.column], suffix="_pk"),
-                    'columns': self.quote_name(field.column)
+                    'table': qtable,
+                    'name': self._cached_index_name(model, [field.column], "_pk"),
+                    'columns': qcolumn
                 }
                 try:
                     self.execute(sql)
-                    self._reorg_tables()
-                except Error as e:
+                    self._reorg_pending = True
+                except DatabaseError:
                     self.execute(del_column)
-                    raise e
+                    raise
             elif unique:
                 field._unique = True
-                constraint_name = self._create_index_name(model, [field.column], suffix="_uniq")
+                # like a primary key, the unique constraint needs the new column reorged first
+                self._flush_reorg()
+                constraint_name = self._cached_index_name(model, [field.column], "_uniq")
                 sql = self.sql_create_unique % {
-                    'table': self.quote_name(model._meta.db_table), 'name': constraint_name,
-                    'columns': self.quote_name(field.column)
+                    'table': qtable, 'name': constraint_name,
+                    'columns': qcolumn
                 }
                 try:
                     self.execute(sql)
-                    self._reorg_tables()
-                except Error as e:
+                    self._reorg_pending = True
+                except DatabaseError:
                     self.execute(del_column)
-                    raise e
+                    raise
+        self._flush_reorg()
 
     def alter_db_table(self, model, old_db_table, new_db_table):
         super(DB2SchemaEditor, self).alter_db_table(model, old_db_table, new_db_table)
@@ -549,11 +753,11 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
             'pk': {},
             'unique': {},
             'index': {},
-            'check': {}
+            'unique_index': {}
         }
 
-        if ((old_field.remote_field is not None and hasattr(old_field.remote_field, 'through')) and
-                (new_field.remote_field is not None and hasattr(new_field.remote_field, 'through'))):
+        if (getattr(old_field.remote_field, 'through', None) is not None and
+                getattr(new_field.remote_field, 'through', None) is not None):
             old_field_rel_through = old_field.remote_field.through
             rel_old_field = old_field.remote_field.through._meta.get_field(old_field.m2m_reverse_field_name())
             rel_new_field = new_field.remote_field.through._meta.get_field(new_field.m2m_reverse_field_name())
@@ -562,112 +766,112 @@ class DB2SchemaEditor(BaseDatabaseSchemaEditor):
             rel_new_field = None
 
         if ((rel_old_field is not None) and (rel_new_field is not None)):
-            with self.connection.cursor() as cur:
-                constraints = self.connection.introspection.get_constraints(cur, old_field_rel_through._meta.db_table)
-            for constr_name, constr_dict in constraints.items():
-                if constr_dict['foreign_key'] is not None:
-                    self.execute(self.sql_delete_fk % {
-                        "table": self.quote_name(old_field_rel_through._meta.db_table),
-                        "name": constr_name,
-                    })
+            # also sends whatever alter_field() has queued so far
+            constraints = self._cached_constraints(old_field_rel_through)
+            sql_delete_fk = _bind_sql(self.sql_delete_fk, table=self.quote_name(old_field_rel_through._meta.db_table))
+            fk_names = _foreign_key_names(constraints)
+            for constr_name in fk_names:
+                self._batched_execute(sql_delete_fk % {'name': constr_name})
+            self._forget_constraints(old_field_rel_through, fk_names)
             self._defer_constraints_check(constraints, deferred_constraints, rel_old_field, rel_new_field,
                                           old_field_rel_through, defer_pk=True, defer_unique=True, defer_index=True)
 
-            self._reorg_tables()
             super(DB2SchemaEditor, self)._alter_many_to_many(model, old_field, new_field, strict)
-            self._restore_constraints_check(deferred_constraints, rel_old_field, rel_new_field, new_field.rel.through)
+            self._restore_constraints_check(deferred_constraints, rel_old_field, rel_new_field,
+                                            new_field.remote_field.through)
+            self._flush_reorg()
+
+    def _flush_reorg(self):
+        """Reorg the tables left pending by earlier DDL, once for however many statements caused it."""
+        if self._reorg_pending:
+            self._reorg_pending = False
+            self._reorg_tables()
+
+    def _before_create_pk(self):
+        # a primary key cannot be added while its table is still waiting for a reorg
+        self._flush_reorg()
 
     def _reorg_tables(self):
         checkReorgSQL = "select tabschema, tabname from sysibmadm.admintabinfo where reorg_pending = 'Y'"
         res = []
-        reorgSQLs = []
+        self._flush_ddl()
         with self.connection.cursor() as cursor:
             cursor.execute(checkReorgSQL)
             res = cursor.fetchall()
-        if res:
-            for sName, tName in res:
-                reorgSQL = '''CALL SYSPROC.ADMIN_CMD('REORG TABLE "%(sName)s"."%(tName)s"')''' % {
-                    'sName': sName, 'tName': tName
-                }
-                reorgSQLs.append(reorgSQL)
-        for sql in reorgSQLs:
-            self.execute(sql)
+        # one compound statement for all pending tables instead of a CALL per table, sent right away
+        # rather than queued in an enclosing batch behind the DDL that left the tables pending
+        self._send_ddl([
+            '''CALL SYSPROC.ADMIN_CMD('REORG TABLE "%(sName)s"."%(tName)s"')''' % {
+                'sName': sName, 'tName': tName
+            } for sName, tName in res
+        ])
 
     def _defer_constraints_check(self, constraints, deferred_constraints, old_field, new_field, model, defer_pk=False,
-                                 defer_unique=False, defer_index=False, defer_check=False):
-        for constr_name, constr_dict in constraints.items():
-            if defer_pk and constr_dict['primary_key'] is True:
-                if old_field.column in constr_dict['columns']:
-                    self.execute(self.sql_delete_pk % {
-                        'table': model._meta.db_table,
-                        'name': constr_name
-                    })
-                    deferred_constraints['pk'][constr_name] = constr_dict['columns']
-                    continue
-            if defer_unique and constr_dict['unique'] is True:
-                if old_field.column in constr_dict['columns']:
-                    try:
-                        self.execute(self.sql_delete_unique % {
-                            'table': model._meta.db_table,
-                            'name': constr_name
-                        })
-                        deferred_constraints['unique'][constr_name] = constr_dict['columns']
-                        continue
-                    except:
-                        continue
-            if defer_index and constr_dict['index'] is True:
-                if old_field.column in constr_dict['columns']:
-                    try:
-                        self.execute(self.sql_delete_index % {
-                            'table': model._meta.db_table,
-                            'name': constr_name
-                        })
-                        deferred_constraints['index'][constr_name] = constr_dict['columns']
-                    except:
-                        pass
-            if defer_check and constr_dict['check'] is True:
-                if old_field.column in constr_dict['columns']:
-                    self.execute(self.sql_delete_check % {
-                        'table': model._meta.db_table,
-                        'name': constr_name
-                    })
-                    deferred_constraints['check'][constr_name] = constr_dict['columns']
+                                 defer_unique=False, defer_index=False):
+        column = old_field.column
+        qtable = self.quote_name(model._meta.db_table)
+        dropped_constraints = []
+        dropped_indexes = []
+        for constr_name, constr_dict in list(constraints.items()):
+            # one scan of a short column list; building a set per constraint would cost more than it saves
+            if column not in constr_dict['columns']:
+                continue
+            # introspection reports the flags as 0/1; a unique SQL index has both unique and index set
+            # and needs DROP INDEX, so index is tested before unique
+            if defer_pk and constr_dict['primary_key']:
+                kind = 'pk'
+            elif defer_index and constr_dict['index']:
+                kind = 'unique_index' if constr_dict['unique'] else 'index'
+            elif defer_unique and constr_dict['unique']:
+                kind = 'unique'
+            else:
+                continue
+            # the introspected constraints are what exists, so no drop below can miss
+            deferred_constraints[kind][constr_name] = tuple(constr_dict['columns'])
+            del constraints[constr_name]
+            if kind in ('index', 'unique_index'):
+                dropped_indexes.append(constr_name)
+            else:
+                dropped_constraints.append(constr_name)
+
+        # Table constraints go in one multi-action ALTER TABLE, indexes are dropped on their own
+        if dropped_constraints:
+            self._batched_execute(self.sql_alter_column % {
+                'table': qtable,
+                'changes': ' '.join([
+                    self.sql_drop_constraint % {'name': self.quote_name(name)} for name in dropped_constraints
+                ])
+            })
+        sql_delete_index = _bind_sql(self.sql_delete_index, table=qtable)
+        for index_name in dropped_indexes:
+            self._batched_execute(sql_delete_index % {'name': self.quote_name(index_name)})
 
         return deferred_constraints
 
     def _restore_constraints_check(self, deferred_constraints, old_field, new_field, model):
-        self.__model = model
-        for pk_name, columns in deferred_constraints['pk'].items():
-            self.execute(self.sql_create_pk % {
-                'table': model._meta.db_table,
-                'name': pk_name,
-                'columns': ', '.join(column.replace(old_field.column, new_field.column) for column in columns)
-            })
-        for constr_name, columns in deferred_constraints['unique'].items():
-            self.execute(self.sql_create_unique % {
-                'table': model._meta.db_table,
-                'name': constr_name,
-                'columns': ', '.join(column.replace(old_field.column, new_field.column) for column in columns)
-            })
-        for index_name, columns in deferred_constraints['index'].items():
-            self.execute(self.sql_create_index % {
-                'table': model._meta.db_table,
-                'name': index_name,
-                'columns': ', '.join(column.replace(old_field.column, new_field.column) for column in columns),
-                'extra': ""
-            })
+        if deferred_constraints['pk']:
+            self._before_create_pk()
+        self._execute_many(self._iter_restore_sql(deferred_constraints, old_field, new_field, model))
+
+    def _iter_restore_sql(self, deferred_constraints, old_field, new_field, model):
+        """
+        Yield the statements recreating the deferred PK, unique and index constraints.
+        Restoring them is bound by round trips to the server, not by CPU, so the statements
+        are streamed into one batch rather than collected per constraint kind.
+        """
+        db_table = model._meta.db_table
+        old_column, new_column = old_field.column, new_field.column
+        # Every key is an identifier, which the driver cannot bind, so % formatting is right; a value
+        # would belong in execute()'s params.
+        for kind, template in (('pk', self.sql_create_pk), ('unique', self.sql_create_unique),
+                               ('index', self.sql_create_index), ('unique_index', self.sql_create_unique_index)):
+            # the indexes' include, extra and condition are always empty, so they are bound with the table
+            template = _bind_sql(template, table=db_table, include='', extra='', condition='')
+            for name, columns in deferred_constraints[kind].items():
+                yield template % {
+                    'name': name,
+                    'columns': _join_renamed(columns, old_column, new_column)
+                }
 
     def quote_value(self, value):
-        if isinstance(value, (datetime.datetime, datetime.date, datetime.time, str)):
-            escape_quotes = lambda s: f'{s}'.replace("'", "''")
-            return f"'{escape_quotes(value)}'"
-        elif isinstance(value, bool):
-            return '1' if value else '0'
-        elif isinstance(value, uuid.UUID):
-            return f"'{value}'"
-        elif isinstance(value, bytes):
-            return f"BLOB(X'{value.hex()}')"
-        elif isinstance(value, datetime.timedelta):
-            # time intervals will be stored as double number of seconds
-            return f"{value / datetime.timedelta(seconds=1)}"
-        return str(value)
+        return quote_literal(value)
@@ -1,8 +1,17 @@
+import datetime
+import uuid
+from decimal import Decimal
+
 import pytest
 from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, models
+from django.utils.safestring import SafeString
 
+from django_iseries import quoting
 from django_iseries.creation import DatabaseCreation
-from tests.models import Object, ObjectReference
+from django_iseries.pybase import DB2CursorWrapper
+from django_iseries.schemaEditor import _bind_sql, _foreign_key_names, _join_renamed
+from tests.models import Object, ObjectReference, Person
 
 
 @pytest.mark.django_db
@@ -23,17 +32,289 @@ def editor(connection):
     return connection.schema_editor()
 
 
+class RecordingCursor:
+    """Stands in for the connection's cursor: records the statements and raises the errors queued for them."""
+
+    def __init__(self):
+        self.executed = []
+        self.errors = []
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture
+def recording_cursor(connection, monkeypatch):
+    cursor = RecordingCursor()
+    monkeypatch.setattr(connection, 'cursor', lambda: cursor)
+    return cursor
+
+
+class Timestamp(datetime.datetime):
+    pass
+
+
 @pytest.mark.parametrize('value,expected', [
     ('string', "'string'"),
+    ("it's", "'it''s'"),
     (42, '42'),
     (1.754, '1.754'),
+    (True, '1'),
     (False, '0'),
+    (bytearray(b'\x00\xff'), "BLOB(X'00ff')"),
+    (SafeString("a'b"), "'a''b'"),
+    (Timestamp(2020, 1, 2, 3, 4, 5), "'2020-01-02 03:04:05'"),
+    (uuid.UUID(int=5), "'00000000-0000-0000-0000-000000000005'"),
+    (memoryview(b'cd'), "BLOB(X'6364')"),
+    (datetime.timedelta(days=1, microseconds=5), '86400.000005'),
+    (None, 'None'),
 ])
 def test_quote_value(editor, value, expected):
     actual = editor.quote_value(value)
     assert expected == actual
 
 
+@pytest.mark.parametrize('value,expected', [
+    ("it's", "'it''s'"),
+    (uuid.UUID(int=1), "'00000000-0000-0000-0000-000000000001'"),
+    (b'ab', "BLOB(X'6162')"),
+    (datetime.timedelta(seconds=90), '90.0'),
+])
+def test_cursor_quote_value(value, expected):
+    # quote_value() needs no live cursor
+    cursor = DB2CursorWrapper.__new__(DB2CursorWrapper)
+    actual = cursor.quote_value(value)
+    assert expected == actual
+
+
+# noinspection PyProtectedMember
+def test_quote_value_leaves_handler_table_alone(editor):
+    handlers = dict(quoting._QUOTERS)
+    assert "'a''b'" == editor.quote_value(SafeString("a'b"))
+    assert '1' == editor.quote_value(Decimal(1))
+    assert handlers == quoting._QUOTERS
+
+
+# noinspection PyProtectedMember
+@pytest.mark.parametrize('old_column,new_column,expected', [
+    ('id', 'pk', 'pk, hub_id'),
+    ('id', 'id', 'id, hub_id'),
+    ('other', 'pk', 'id, hub_id'),
+])
+def test_join_renamed(old_column, new_column, expected):
+    assert expected == _join_renamed(('id', 'hub_id'), old_column, new_column)
+
+
+# noinspection PyProtectedMember
+def test_cached_index_name(editor):
+    expected = editor._create_index_name(Object._meta.db_table, ['id'], suffix='_fk')
+    assert expected == editor._cached_index_name(Object, ['id'], '_fk')
+    assert expected == editor._cached_index_name(Object, ['id'], '_fk')
+
+
+# noinspection PyProtectedMember
+def test_foreign_key_names():
+    # shaped like DatabaseIntrospection.get_constraints() output
+    constraints = {
+        'through_pk': {'columns': ['id'], 'primary_key': 1, 'unique': 1, 'foreign_key': 0, 'check': 0,
+                       'index': False},
+        'through_fk': {'columns': ['from_id'], 'primary_key': 0, 'unique': 0, 'foreign_key': 1, 'check': 0,
+                       'index': False},
+        'through_idx': {'columns': ['to_id'], 'primary_key': False, 'unique': 0, 'foreign_key': None,
+                        'check': False, 'index': True},
+    }
+    assert ['through_fk'] == _foreign_key_names(constraints)
+
+
+# noinspection PyProtectedMember
+@pytest.mark.parametrize('template,invariants,params,expected', [
+    ('ALTER TABLE %(table)s DROP CONSTRAINT %(name)s', {'table': 'T'}, {'name': 'C'},
+     'ALTER TABLE T DROP CONSTRAINT C'),
+    ("SELECT '100%%' FROM %(table)s WHERE X = %(x)s", {'table': 'T'}, {'x': 1},
+     "SELECT '100%' FROM T WHERE X = 1"),
+    ('START WITH %(max)d IN %(table)s', {'table': 'T'}, {'max': 5}, 'START WITH 5 IN T'),
+    ('START WITH %(max)d IN %(table)s', {'max': 7}, {'table': 'T'}, 'START WITH 7 IN T'),
+    ('%(table)s %(name)s', {'table': 'A%B'}, {'name': 'C'}, 'A%B C'),
+])
+def test_bind_sql(template, invariants, params, expected):
+    bound = _bind_sql(template, **invariants)
+    assert expected == bound % params
+    assert template % dict(invariants, **params) == bound % params
+
+
+# noinspection PyProtectedMember
+def test_batched_ddl_is_sent_as_one_compound(editor, recording_cursor):
+    with editor._batched():
+        editor._batched_execute('ALTER TABLE A')
+        editor._batched_execute('ALTER TABLE B')
+    assert [editor.sql_compound % {'statements': 'ALTER TABLE A;\nALTER TABLE B'}] == recording_cursor.executed
+
+
+# noinspection PyProtectedMember
+@pytest.mark.parametrize('error', [
+    DatabaseError('HY000', '[HY000] [IBM][System i Access ODBC Driver][DB2 for i5/OS]SQL0084 - '
+                           'Statement not allowed.'),
+    DatabaseError('42612', 'Statement not allowed.'),
+])
+def test_batched_ddl_falls_back_when_compound_is_refused(connection, editor, recording_cursor, error):
+    recording_cursor.errors.append(error)
+    with editor._batched():
+        editor._batched_execute('ALTER TABLE A')
+        editor._batched_execute('ALTER TABLE B')
+    assert ['ALTER TABLE A', 'ALTER TABLE B'] == recording_cursor.executed[1:]
+    assert not connection.features.supports_compound_ddl
+
+
+# noinspection PyProtectedMember
+def test_batched_ddl_reraises_other_errors(connection, editor, recording_cursor):
+    recording_cursor.errors.append(
+        DatabaseError('HY000', '[HY000] [IBM][System i Access ODBC Driver][DB2 for i5/OS]SQL0204 - '
+                               'A in *LIBL type *FILE not found.')
+    )
+    with pytest.raises(DatabaseError):
+        with editor._batched():
+            editor._batched_execute('ALTER TABLE A')
+            editor._batched_execute('ALTER TABLE B')
+    assert 1 == len(recording_cursor.executed)
+    assert connection.features.supports_compound_ddl
+
+
+# noinspection PyProtectedMember
+def test_reorg_is_not_queued_in_the_enclosing_batch(editor, recording_cursor):
+    recording_cursor.rows = [('S', 'A')]
+    with editor._batched():
+        editor._batched_execute('ALTER TABLE A')
+        editor._reorg_pending = True
+        editor._flush_reorg()
+        editor._batched_execute('ALTER TABLE B')
+    assert 'ALTER TABLE A' == recording_cursor.executed[0]
+    assert '''CALL SYSPROC.ADMIN_CMD('REORG TABLE "S"."A"')''' == recording_cursor.executed[2]
+    assert 'ALTER TABLE B' == recording_cursor.executed[3]
+
+
+# noinspection PyProtectedMember
+def test_deferred_pk_is_restored_after_reorg(editor, recording_cursor):
+    pk = Object._meta.pk
+    deferred_constraints = {'pk': {'OBJECT_PK': (pk.column,)}, 'unique': {}, 'index': {}, 'unique_index': {}}
+    with editor._batched():
+        editor._batched_alter_column('ALTER TABLE OBJECT ALTER COLUMN ID SET DATA TYPE BIGINT')
+        editor._restore_constraints_check(deferred_constraints, pk, pk, Object)
+    assert [
+        'ALTER TABLE OBJECT ALTER COLUMN ID SET DATA TYPE BIGINT',
+        "select tabschema, tabname from sysibmadm.admintabinfo where reorg_pending = 'Y'",
+        editor.sql_create_pk % {'table': Object._meta.db_table, 'name': 'OBJECT_PK', 'columns': pk.column},
+    ] == recording_cursor.executed
+
+
+# noinspection PyProtectedMember
+def test_defer_constraints_check(editor, recording_cursor):
+    pk = Object._meta.pk
+    # shaped like DatabaseIntrospection.get_constraints() output
+    constraints = {
+        'object_pk': {'columns': ['id'], 'primary_key': 1, 'unique': 0, 'foreign_key': 0, 'check': 0,
+                      'index': False},
+        'object_uniq': {'columns': ['id', 'name'], 'primary_key': 0, 'unique': 1, 'foreign_key': 0, 'check': 0,
+                        'index': False},
+        'object_uidx': {'columns': ['id'], 'primary_key': False, 'unique': 1, 'foreign_key': None,
+                        'check': False, 'index': True},
+        'object_idx': {'columns': ['id'], 'primary_key': False, 'unique': 0, 'foreign_key': None,
+                       'check': False, 'index': True},
+        'object_check': {'columns': ['id'], 'primary_key': 0, 'unique': 0, 'foreign_key': 0, 'check': 1,
+                         'index': False},
+        'object_fk': {'columns': ['id'], 'primary_key': 0, 'unique': 0, 'foreign_key': 1, 'check': 0,
+                      'index': False},
+        'other_idx': {'columns': ['name'], 'primary_key': False, 'unique': 0, 'foreign_key': None,
+                      'check': False, 'index': True},
+    }
+    deferred_constraints = {'pk': {}, 'unique': {}, 'index': {}, 'unique_index': {}}
+    editor._defer_constraints_check(constraints, deferred_constraints, pk, pk, Object, defer_pk=True,
+                                    defer_unique=True, defer_index=True)
+    assert {
+        'pk': {'object_pk': ('id',)},
+        'unique': {'object_uniq': ('id', 'name')},
+        'index': {'object_idx': ('id',)},
+        'unique_index': {'object_uidx': ('id',)},
+    } == deferred_constraints
+    assert {'object_check', 'object_fk', 'other_idx'} == set(constraints)
+    qtable = editor.quote_name(Object._meta.db_table)
+    assert [
+        'ALTER TABLE %s DROP CONSTRAINT "OBJECT_PK" DROP CONSTRAINT "OBJECT_UNIQ"' % qtable,
+        'DROP INDEX "OBJECT_UIDX"',
+        'DROP INDEX "OBJECT_IDX"',
+    ] == recording_cursor.executed
+
+
+# noinspection PyProtectedMember
+def test_alter_column_to_auto_sql(editor):
+    assert (
+        'BEGIN ATOMIC\n'
+        'DECLARE V_MAX BIGINT;\n'
+        'SET V_MAX = COALESCE((SELECT MAX("ID") FROM "T"), 0) + 1;\n'
+        "EXECUTE IMMEDIATE 'ALTER TABLE \"T\" ALTER COLUMN \"ID\" SET DATA TYPE Integer';\n"
+        "EXECUTE IMMEDIATE 'ALTER TABLE \"T\" ALTER COLUMN \"ID\" SET GENERATED BY DEFAULT AS IDENTITY( "
+        "START WITH ' || CHAR(V_MAX) || ', INCREMENT BY 1, CACHE 10 ORDER )';\n"
+        'END'
+    ) == editor._alter_column_to_auto_sql('"T"', '"ID"', to_integer=True)
+    # the template itself still takes the start value as an int
+    assert 'START WITH 42,' in editor.sql_alter_column_type_from_int_to_auto % {'column': '"ID"', 'max': 42}
+
+
+def make_field(field_class=models.IntegerField, **kwargs):
+    field = field_class(**kwargs)
+    field.set_attributes_from_name('value')
+    return field
+
+
+@pytest.fixture
+def altered_fields(editor, monkeypatch):
+    altered = []
+    monkeypatch.setattr(editor, '_batched_alter_field',
+                        lambda model, old_field, new_field, strict=False: altered.append(new_field))
+    return altered
+
+
+@pytest.mark.parametrize('new_field,skipped', [
+    (make_field(help_text='no DDL'), True),
+    (make_field(null=True), False),
+    (make_field(unique=True), False),
+    (make_field(db_index=True), False),
+    (make_field(default=1), False),
+    (make_field(models.BigIntegerField), False),
+    (make_field(db_column='other'), False),
+])
+def test_alter_field_skips_changes_without_ddl(editor, altered_fields, new_field, skipped):
+    editor.alter_field(Person, make_field(), new_field)
+    assert ([] if skipped else [new_field]) == altered_fields
+
+
+def test_alter_field_does_not_skip_multi_column_foreign_object(editor, altered_fields):
+    def make_foreign_object():
+        field = models.ForeignObject(Person, models.CASCADE, from_fields=['first_name', 'last_name'],
+                                     to_fields=['first_name', 'last_name'])
+        field.set_attributes_from_name('namesake')
+        # what contribute_to_class() would set, without adding the field to Person
+        field.model, field.opts = Person, Person._meta
+        return field
+
+    new_field = make_foreign_object()
+    editor.alter_field(Person, make_foreign_object(), new_field)
+    assert [new_field] == altered_fields
+
+
 # noinspection PyProtectedMember
 def test_create_test_db(connection):
     creation = DatabaseCreation(connection)